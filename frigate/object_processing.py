@@ -859,13 +859,13 @@ class TrackedObjectProcessor(threading.Thread):
                 o.to_dict() for o in camera_state.tracked_objects.values()
             ]
 
+            # the output process only needs counts, so avoid pickling the full objects
             self.video_output_queue.put(
                 (
                     camera,
                     frame_time,
-                    tracked_objects,
-                    motion_boxes,
-                    regions,
+                    sum(1 for o in tracked_objects if not o["stationary"]),
+                    len(motion_boxes),
                 )
             )
 
@@ -1,12 +1,15 @@
-import datetime
+import fcntl
 import glob
 import logging
 import math
-import multiprocessing as mp
+import os
 import queue
+import selectors
 import signal
 import subprocess as sp
 import threading
+import time
+from collections import defaultdict
 from multiprocessing import shared_memory
 from wsgiref.simple_server import make_server
 
@@ -18,14 +21,34 @@ from ws4py.server.wsgirefserver import (
     WebSocketWSGIRequestHandler,
     WSGIServer,
 )
+from ws4py.messaging import BinaryMessage
 from ws4py.server.wsgiutils import WebSocketWSGIApplication
 from ws4py.websocket import WebSocket
 
 from frigate.config import BirdseyeModeEnum, FrigateConfig
-from frigate.util import SharedMemoryFrameManager, copy_yuv_to_position, get_yuv_crop
+from frigate.util import SharedMemoryFrameManager, get_yuv_planes
 
 logger = logging.getLogger(__name__)
 
+# size of the pipe buffers to and from the ffmpeg converters
+PIPE_BUFFER_SIZE = 1024 * 1024
+# F_SETPIPE_SZ is only exposed by the fcntl module in python 3.10+
+F_SETPIPE_SZ = getattr(fcntl, "F_SETPIPE_SZ", 1031)
+# birdseye frames are not composed or sent to ffmpeg more often than this
+BIRDSEYE_MAX_FPS = 10
+
+
+def delete_frame(frame_manager: SharedMemoryFrameManager, name):
+    if name in frame_manager.shm_store:
+        frame_manager.delete(name)
+        return
+
+    # frames this process never mapped are unlinked from /dev/shm without opening them
+    try:
+        os.unlink(os.path.join("/dev/shm", name))
+    except FileNotFoundError:
+        pass
+
 
 class FFMpegConverter:
     def __init__(self, in_width, in_height, out_width, out_height, quality):
@@ -38,15 +61,27 @@ class FFMpegConverter:
             stderr=sp.DEVNULL,
             stdin=sp.PIPE,
             start_new_session=True,
+            # frames are written and read directly on the pipe file descriptors
+            bufsize=0,
         )
 
+        # enlarge the kernel pipe buffer so large frames don't block after 64KB
+        try:
+            fcntl.fcntl(self.process.stdin.fileno(), F_SETPIPE_SZ, PIPE_BUFFER_SIZE)
+        except OSError as e:
+            logger.debug(f"Unable to resize ffmpeg stdin pipe: {e}")
+
     def write(self, b):
-        self.process.stdin.write(b)
+        # accept any buffer (e.g. a contiguous numpy frame) without copying to bytes
+        view = memoryview(b).cast("B")
+        fd = self.process.stdin.fileno()
+        while view:
+            view = view[os.write(fd, view) :]
 
     def read(self, length):
         try:
-            return self.process.stdout.read1(length)
-        except ValueError:
+            return os.read(self.process.stdout.fileno(), length)
+        except (ValueError, OSError):
             return False
 
     def exit(self):
@@ -58,33 +93,68 @@ class FFMpegConverter:
             self.process.communicate()
 
 
+class CameraWebSocket(WebSocket):
+    # connected websockets keyed by the camera name at the end of the path
+    subscribers = defaultdict(set)
+
+    def opened(self):
+        self.camera = self.environ["PATH_INFO"].rsplit("/", 1)[-1]
+        self.subscribers[self.camera].add(self)
+
+    def closed(self, code, reason=None):
+        camera = getattr(self, "camera", None)
+        if camera is not None:
+            self.subscribers[camera].discard(self)
+
+
 class BroadcastThread(threading.Thread):
-    def __init__(self, camera, converter, websocket_server):
+    def __init__(self, converters, subscribers):
         super(BroadcastThread, self).__init__()
-        self.camera = camera
-        self.converter = converter
-        self.websocket_server = websocket_server
+        self.converters = converters
+        self.subscribers = subscribers
+        self.selector = selectors.DefaultSelector()
 
     def run(self):
-        while True:
-            buf = self.converter.read(65536)
-            if buf:
-                manager = self.websocket_server.manager
-                with manager.lock:
-                    websockets = manager.websockets.copy()
-                    ws_iter = iter(websockets.values())
-
-                for ws in ws_iter:
-                    if (
-                        not ws.terminated
-                        and ws.environ["PATH_INFO"] == f"/{self.camera}"
-                    ):
+        for camera, converter in self.converters.items():
+            self.selector.register(
+                converter.process.stdout.fileno(),
+                selectors.EVENT_READ,
+                # the subscriber set for a camera is never replaced, so bind it once
+                (self.subscribers[camera], converter),
+            )
+
+        while self.selector.get_map():
+            events = self.selector.select(timeout=1)
+
+            # when idle, stop watching converters that have exited
+            if not events:
+                for key in list(self.selector.get_map().values()):
+                    if key.data[1].process.poll() is not None:
+                        self.selector.unregister(key.fd)
+
+            for key, _ in events:
+                camera_subscribers, converter = key.data
+                buf = converter.read(PIPE_BUFFER_SIZE)
+                if not buf:
+                    # the converter closed its output
+                    self.selector.unregister(key.fd)
+                    continue
+
+                if not camera_subscribers:
+                    continue
+
+                # frame the message once and send the same bytes to every client
+                message = BinaryMessage(buf).single(mask=False)
+
+                # copy so clients can connect or disconnect while sending
+                for ws in camera_subscribers.copy():
+                    if not ws.terminated:
                         try:
-                            ws.send(buf, binary=True)
+                            ws.sock.sendall(message)
                         except:
                             pass
-            elif self.converter.process.poll() is not None:
-                break
+
+        self.selector.close()
 
 
 class BirdsEyeFrameManager:
@@ -97,6 +167,8 @@ class BirdsEyeFrameManager:
         self.frame_shape = (height, width)
         self.yuv_shape = (height * 3 // 2, width)
         self.frame = np.ndarray(self.yuv_shape, dtype=np.uint8)
+        # views of the y, u and v planes so tiles can be composed per plane
+        self.y, self.u, self.v = get_yuv_planes(self.frame)
 
         # initialize the frame as black and with the frigate logo
         self.blank_frame = np.zeros(self.yuv_shape, np.uint8)
@@ -121,48 +193,44 @@ class BirdsEyeFrameManager:
 
         self.frame[:] = self.blank_frame
 
+        # keep the blank frame as a read only template to restore positions from
+        self.blank_frame.setflags(write=False)
+        self.blank_planes = get_yuv_planes(self.blank_frame)
+        # positions drawn since the last clear and the camera last drawn in each
+        self.drawn_positions = {}
+
         self.cameras = {}
         for camera, settings in self.config.cameras.items():
-            # precalculate the coordinates for all the channels
-            y, u1, u2, v1, v2 = get_yuv_crop(
-                settings.frame_shape_yuv,
-                (
-                    0,
-                    0,
-                    settings.frame_shape[1],
-                    settings.frame_shape[0],
-                ),
-            )
             self.cameras[camera] = {
+                "frame_shape_yuv": settings.frame_shape_yuv,
                 "last_active_frame": 0.0,
                 "current_frame": 0.0,
                 "layout_frame": 0.0,
-                "channel_dims": {
-                    "y": y,
-                    "u1": u1,
-                    "u2": u2,
-                    "v1": v1,
-                    "v2": v2,
-                },
             }
 
         self.camera_layout = []
         self.active_cameras = set()
         self.layout_dim = 0
         self.last_output_time = 0.0
+        self.max_output_interval = 1 / BIRDSEYE_MAX_FPS
 
     def clear_frame(self):
         logger.debug(f"Clearing the birdseye frame")
-        self.frame[:] = self.blank_frame
+        # only the positions drawn since the last clear differ from the blank frame
+        for position in self.drawn_positions:
+            for dest, blank in zip(
+                self.layout_positions[position], self.blank_positions[position]
+            ):
+                dest[:] = blank
+        self.drawn_positions.clear()
 
     def copy_to_position(self, position, camera=None, frame_time=None):
         if camera is None:
             frame = None
-            channel_dims = None
         else:
             try:
                 frame = self.frame_manager.get(
-                    f"{camera}{frame_time}", self.config.cameras[camera].frame_shape_yuv
+                    f"{camera}{frame_time}", self.cameras[camera]["frame_shape_yuv"]
                 )
             except FileNotFoundError:
                 # TODO: better frame management would prevent this edge case
@@ -170,15 +238,62 @@ class BirdsEyeFrameManager:
                     f"Unable to copy frame {camera}{frame_time} to birdseye."
                 )
                 return
-            channel_dims = self.cameras[camera]["channel_dims"]
-
-        copy_yuv_to_position(
-            self.frame,
-            self.layout_offsets[position],
-            self.layout_frame_shape,
-            frame,
-            channel_dims,
+
+        dest_y, dest_u, dest_v = self.layout_positions[position]
+
+        # clear the position, unless the same camera is redrawn over its own region
+        if camera is None or self.drawn_positions.get(position) != camera:
+            dest_y[:] = 16
+            dest_u[:] = 128
+            dest_v[:] = 128
+            self.drawn_positions[position] = None
+
+        if frame is None:
+            return
+
+        # resize each plane directly into the birdseye frame
+        y_region, uv_region = self.cameras[camera]["layout_region"]
+        for source, dest in zip(
+            get_yuv_planes(frame),
+            (dest_y[y_region], dest_u[uv_region], dest_v[uv_region]),
+        ):
+            cv2.resize(
+                source,
+                dsize=(dest.shape[1], dest.shape[0]),
+                dst=dest,
+                interpolation=cv2.INTER_LINEAR,
+            )
+
+        self.drawn_positions[position] = camera
+
+    def calculate_layout_region(self, camera):
+        # calculate the resized frame within a position, maintaining the aspect ratio
+        height, width = self.layout_frame_shape
+        source_aspect_ratio = (
+            self.config.cameras[camera].frame_shape[1]
+            / self.config.cameras[camera].frame_shape[0]
         )
+        dest_aspect_ratio = width / height
+
+        if source_aspect_ratio <= dest_aspect_ratio:
+            resize_height = int(height // 4 * 4)
+            resize_width = int((resize_height * source_aspect_ratio) // 4 * 4)
+        else:
+            resize_width = int(width // 4 * 4)
+            resize_height = int((resize_width / source_aspect_ratio) // 4 * 4)
+
+        y_offset = int((height - resize_height) / 4 // 4 * 4)
+        x_offset = int((width - resize_width) / 2 // 4 * 4)
+
+        y_region = (
+            slice(y_offset, y_offset + resize_height),
+            slice(x_offset, x_offset + resize_width),
+        )
+        uv_region = (
+            slice(y_offset // 2, (y_offset + resize_height) // 2),
+            slice(x_offset // 2, (x_offset + resize_width) // 2),
+        )
+        return y_region, uv_region
 
     def camera_active(self, object_box_count, motion_box_count):
         if self.mode == BirdseyeModeEnum.continuous:
@@ -192,14 +307,12 @@ class BirdsEyeFrameManager:
 
     def update_frame(self):
         # determine how many cameras are tracking objects within the last 30 seconds
-        active_cameras = set(
-            [
-                cam
-                for cam, cam_data in self.cameras.items()
-                if cam_data["last_active_frame"] > 0
-                and cam_data["current_frame"] - cam_data["last_active_frame"] < 30
-            ]
-        )
+        active_cameras = {
+            cam
+            for cam, cam_data in self.cameras.items()
+            if cam_data["last_active_frame"] > 0
+            and cam_data["current_frame"] - cam_data["last_active_frame"] < 30
+        }
 
         # if there are no active cameras
         if len(active_cameras) == 0:
@@ -213,8 +326,12 @@ class BirdsEyeFrameManager:
                 self.clear_frame()
                 return True
 
-        # calculate layout dimensions
-        layout_dim = math.ceil(math.sqrt(len(active_cameras)))
+        # calculate layout dimensions if the active cameras no longer fit the current one
+        active_count = len(active_cameras)
+        if (self.layout_dim - 1) ** 2 < active_count <= self.layout_dim**2:
+            layout_dim = self.layout_dim
+        else:
+            layout_dim = math.ceil(math.sqrt(active_count))
 
         # reset the layout if it needs to be different
         if layout_dim != self.layout_dim:
@@ -229,6 +346,8 @@ class BirdsEyeFrameManager:
                 self.frame_shape[1] // layout_dim,  # width
             )
 
+            # clear before layout_positions is rebuilt below, clear_frame() restores
+            # the drawn positions using the views of the previous layout
             self.clear_frame()
 
             for cam_data in self.cameras.values():
@@ -236,18 +355,40 @@ class BirdsEyeFrameManager:
 
             self.active_cameras = set()
 
-            self.layout_offsets = []
-
-            # calculate the x and y offset for each position in the layout
+            # precalculate the views of each plane for every position in the layout
+            self.layout_positions = []
+            self.blank_positions = []
+            blank_y, blank_u, blank_v = self.blank_planes
+            height, width = self.layout_frame_shape
             for position in range(0, len(self.camera_layout)):
-                y_offset = self.layout_frame_shape[0] * math.floor(
-                    position / self.layout_dim
+                y_offset = height * (position // self.layout_dim)
+                x_offset = width * (position % self.layout_dim)
+                y_position = (
+                    slice(y_offset, y_offset + height),
+                    slice(x_offset, x_offset + width),
+                )
+                uv_position = (
+                    slice(y_offset // 2, (y_offset + height) // 2),
+                    slice(x_offset // 2, (x_offset + width) // 2),
+                )
+                self.layout_positions.append(
+                    (self.y[y_position], self.u[uv_position], self.v[uv_position])
+                )
+                self.blank_positions.append(
+                    (blank_y[y_position], blank_u[uv_position], blank_v[uv_position])
                 )
-                x_offset = self.layout_frame_shape[1] * (position % self.layout_dim)
-                self.layout_offsets.append((y_offset, x_offset))
+
+            # precalculate where each camera is resized to within a position
+            for camera, cam_data in self.cameras.items():
+                cam_data["layout_region"] = self.calculate_layout_region(camera)
 
         removed_cameras = self.active_cameras.difference(active_cameras)
-        added_cameras = active_cameras.difference(self.active_cameras)
+        # cameras are placed in the order they are configured, so reverse them to pop
+        added_cameras = [
+            cam
+            for cam in reversed(self.cameras.keys())
+            if cam in active_cameras and not cam in self.active_cameras
+        ]
 
         self.active_cameras = active_cameras
 
@@ -292,7 +433,9 @@ class BirdsEyeFrameManager:
                 != self.cameras[camera]["layout_frame"]
             ):
                 self.copy_to_position(
-                    position, camera, self.cameras[camera]["current_frame"]
+                    position,
+                    camera,
+                    self.cameras[camera]["current_frame"],
                 )
                 self.cameras[camera]["layout_frame"] = self.cameras[camera][
                     "current_frame"
@@ -300,17 +443,17 @@ class BirdsEyeFrameManager:
 
         return True
 
-    def update(self, camera, object_count, motion_count, frame_time, frame) -> bool:
+    def update(self, camera, object_count, motion_count, frame_time) -> bool:
 
         # update the last active frame for the camera
         self.cameras[camera]["current_frame"] = frame_time
         if self.camera_active(object_count, motion_count):
             self.cameras[camera]["last_active_frame"] = frame_time
 
-        now = datetime.datetime.now().timestamp()
+        now = time.monotonic()
 
-        # limit output to 10 fps
-        if (now - self.last_output_time) < 1 / 10:
+        # limit output to the max birdseye fps
+        if (now - self.last_output_time) < self.max_output_interval:
             return False
 
         # if the frame was updated or the fps is too low, send frame
@@ -324,7 +467,8 @@ def output_frames(config: FrigateConfig, video_output_queue):
     threading.current_thread().name = f"output"
     setproctitle(f"frigate.output")
 
-    stop_event = mp.Event()
+    # only this process checks for shutdown, so a process shared event is not needed
+    stop_event = threading.Event()
 
     def receiveSignal(signalNumber, frame):
         stop_event.set()
@@ -342,13 +486,13 @@ def output_frames(config: FrigateConfig, video_output_queue):
         8082,
         server_class=WSGIServer,
         handler_class=WebSocketWSGIRequestHandler,
-        app=WebSocketWSGIApplication(handler_cls=WebSocket),
+        app=WebSocketWSGIApplication(handler_cls=CameraWebSocket),
     )
     websocket_server.initialize_websockets_manager()
+    subscribers = CameraWebSocket.subscribers
     websocket_thread = threading.Thread(target=websocket_server.serve_forever)
 
     converters = {}
-    broadcasters = {}
 
     for camera, cam_config in config.cameras.items():
         width = int(
@@ -362,9 +506,6 @@ def output_frames(config: FrigateConfig, video_output_queue):
             cam_config.live.height,
             cam_config.live.quality,
         )
-        broadcasters[camera] = BroadcastThread(
-            camera, converters[camera], websocket_server
-        )
 
     if config.birdseye.enabled:
         converters["birdseye"] = FFMpegConverter(
@@ -374,76 +515,70 @@ def output_frames(config: FrigateConfig, video_output_queue):
             config.birdseye.height,
             config.birdseye.quality,
         )
-        broadcasters["birdseye"] = BroadcastThread(
-            "birdseye", converters["birdseye"], websocket_server
-        )
 
-    websocket_thread.start()
+    broadcaster = BroadcastThread(converters, subscribers)
+    birdseye_subscribers = subscribers["birdseye"]
 
-    for t in broadcasters.values():
-        t.start()
+    websocket_thread.start()
+    broadcaster.start()
 
     birdseye_manager = BirdsEyeFrameManager(config, frame_manager)
 
+    # resolve per camera config once instead of on every frame
+    birdseye_enabled = config.birdseye.enabled
+    frame_shapes = {
+        camera: cam_config.frame_shape_yuv
+        for camera, cam_config in config.cameras.items()
+    }
+
     while not stop_event.is_set():
         try:
             (
                 camera,
                 frame_time,
-                current_tracked_objects,
-                motion_boxes,
-                regions,
-            ) = video_output_queue.get(True, 10)
+                active_object_count,
+                motion_box_count,
+            ) = video_output_queue.get(True, 0.5)
         except queue.Empty:
             continue
 
+        # the id must match the name of the shared memory created by the capture process
         frame_id = f"{camera}{frame_time}"
 
-        frame = frame_manager.get(frame_id, config.cameras[camera].frame_shape_yuv)
-
         # send camera frame to ffmpeg process if websockets are connected
-        if any(
-            ws.environ["PATH_INFO"].endswith(camera) for ws in websocket_server.manager
-        ):
-            # write to the converter for the camera if clients are listening to the specific camera
-            converters[camera].write(frame.tobytes())
+        if subscribers[camera]:
+            # only map the frame when clients are listening to the specific camera
+            frame = frame_manager.get(frame_id, frame_shapes[camera])
+            converters[camera].write(frame)
 
         # update birdseye if websockets are connected
-        if config.birdseye.enabled and any(
-            ws.environ["PATH_INFO"].endswith("birdseye")
-            for ws in websocket_server.manager
-        ):
+        if birdseye_enabled and birdseye_subscribers:
             if birdseye_manager.update(
                 camera,
-                len([o for o in current_tracked_objects if not o["stationary"]]),
-                len(motion_boxes),
+                active_object_count,
+                motion_box_count,
                 frame_time,
-                frame,
             ):
-                converters["birdseye"].write(birdseye_manager.frame.tobytes())
+                converters["birdseye"].write(birdseye_manager.frame)
 
         if camera in previous_frames:
-            frame_manager.delete(f"{camera}{previous_frames[camera]}")
+            delete_frame(frame_manager, previous_frames[camera])
 
-        previous_frames[camera] = frame_time
+        previous_frames[camera] = frame_id
 
     while not video_output_queue.empty():
         (
             camera,
             frame_time,
-            current_tracked_objects,
-            motion_boxes,
-            regions,
+            active_object_count,
+            motion_box_count,
         ) = video_output_queue.get(True, 10)
 
-        frame_id = f"{camera}{frame_time}"
-        frame = frame_manager.get(frame_id, config.cameras[camera].frame_shape_yuv)
-        frame_manager.delete(frame_id)
+        delete_frame(frame_manager, f"{camera}{frame_time}")
 
     for c in converters.values():
         c.exit()
-    for b in broadcasters.values():
-        b.join()
+    broadcaster.join()
     websocket_server.manager.close_all()
     websocket_server.manager.stop()
     websocket_server.manager.join()
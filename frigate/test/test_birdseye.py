@@ -0,0 +1,132 @@
+import os
+from types import SimpleNamespace
+from unittest import TestCase, main
+from unittest.mock import patch
+
+import numpy as np
+
+import frigate
+from frigate.config import BirdseyeModeEnum
+from frigate.output import BirdsEyeFrameManager
+
+
+class FakeFrameManager:
+    def __init__(self):
+        self.frames = {}
+
+    def add(self, camera, frame_time, frame_shape_yuv, value):
+        self.frames[f"{camera}{frame_time}"] = np.full(frame_shape_yuv, value, np.uint8)
+
+    def get(self, name, shape):
+        if not name in self.frames:
+            raise FileNotFoundError(name)
+        return self.frames[name]
+
+
+def camera_config(height, width):
+    return SimpleNamespace(
+        frame_shape=(height, width), frame_shape_yuv=(height * 3 // 2, width)
+    )
+
+
+class FullClearBirdsEyeFrameManager(BirdsEyeFrameManager):
+    # reference that restores the whole blank frame on every clear
+    def clear_frame(self):
+        self.frame[:] = self.blank_frame
+        self.drawn_positions.clear()
+
+
+class TestBirdseye(TestCase):
+    def setUp(self):
+        self.cameras = {
+            "wide": camera_config(360, 640),
+            "tall": camera_config(640, 360),
+        }
+        self.frame_manager = FakeFrameManager()
+        self.now = 1000.0
+        self.birdseye = self.create_birdseye(BirdsEyeFrameManager)
+
+    def create_birdseye(self, manager_cls):
+        config = SimpleNamespace(
+            birdseye=SimpleNamespace(
+                mode=BirdseyeModeEnum.objects, width=1280, height=720
+            ),
+            cameras=self.cameras,
+        )
+
+        # use the frigate logo from the source tree for the blank frame
+        logo = os.path.join(os.path.dirname(frigate.__file__), "birdseye.png")
+        with patch("frigate.output.glob.glob", return_value=[logo]):
+            return manager_cls(config, self.frame_manager)
+
+    def update(self, camera, object_count, frame_time, elapsed=0.2, birdseye=None):
+        # step the output clock so the update is or isn't rate limited
+        self.now += elapsed
+        with patch("frigate.output.time.monotonic", return_value=self.now):
+            return (birdseye or self.birdseye).update(
+                camera, object_count, 0, frame_time
+            )
+
+    def test_replaced_camera_with_missing_frame_is_cleared(self):
+        self.frame_manager.add("wide", 1.0, self.cameras["wide"].frame_shape_yuv, 200)
+        assert self.update("wide", 1, 1.0)
+
+        # tall becomes active while the output is rate limited, then wide goes
+        # inactive so tall replaces it in the same position, but its frame is gone
+        assert not self.update("tall", 1, 40.0, elapsed=0.01)
+        assert self.update("wide", 0, 40.0)
+        assert self.birdseye.camera_layout == ["tall"]
+
+        # the next frame for tall must clear the whole position, not just its region
+        self.frame_manager.add("tall", 41.0, self.cameras["tall"].frame_shape_yuv, 50)
+        assert self.update("tall", 1, 41.0)
+
+        y_region, uv_region = self.birdseye.cameras["tall"]["layout_region"]
+        for plane, region, blank, value in (
+            (self.birdseye.y, y_region, 16, 50),
+            (self.birdseye.u, uv_region, 128, 50),
+            (self.birdseye.v, uv_region, 128, 50),
+        ):
+            drawn = np.zeros(plane.shape, bool)
+            drawn[region] = True
+            assert np.all(plane[drawn] == value)
+            assert np.all(plane[~drawn] == blank)
+
+    def test_clear_restores_blank_frame(self):
+        self.cameras = {
+            f"camera_{i}": camera_config(360 + 60 * i, 640) for i in range(5)
+        }
+        self.birdseye = self.create_birdseye(BirdsEyeFrameManager)
+        reference = self.create_birdseye(FullClearBirdsEyeFrameManager)
+
+        def update_both(camera, object_count, frame_time):
+            self.frame_manager.add(
+                camera,
+                frame_time,
+                self.cameras[camera].frame_shape_yuv,
+                20 + 40 * int(camera[-1]),
+            )
+            now = self.now
+            self.update(camera, object_count, frame_time)
+            self.now = now
+            self.update(camera, object_count, frame_time, birdseye=reference)
+            assert np.array_equal(self.birdseye.frame, reference.frame)
+
+        # compose a 3x3 layout
+        for i in range(5):
+            update_both(f"camera_{i}", 1, 1.0 + i)
+        assert self.birdseye.layout_dim == 3
+
+        # shrink to a 2x2 layout, then drop to no active cameras
+        for i in range(3):
+            update_both(f"camera_{i}", 0, 40.0 + i)
+        assert self.birdseye.layout_dim == 2
+        for i in range(3, 5):
+            update_both(f"camera_{i}", 0, 50.0 + i)
+        assert self.birdseye.layout_dim == 0
+
+        assert np.array_equal(self.birdseye.frame, self.birdseye.blank_frame)
+
+
+if __name__ == "__main__":
+    main(verbosity=2)
@@ -0,0 +1,48 @@
+import os
+from multiprocessing import resource_tracker, shared_memory
+from unittest import TestCase, main
+from unittest.mock import patch
+
+from frigate.output import delete_frame
+from frigate.util import SharedMemoryFrameManager
+
+
+class TestDeleteFrame(TestCase):
+    def setUp(self):
+        self.name = "test_delete_frame1650000000.123456"
+        self.shm = shared_memory.SharedMemory(name=self.name, create=True, size=16)
+        self.shm.close()
+        # the capture process owns the segment, so don't track it from the test
+        resource_tracker.unregister(self.shm._name, "shared_memory")
+        self.frame_manager = SharedMemoryFrameManager()
+
+    def tearDown(self):
+        try:
+            shared_memory.SharedMemory(name=self.name).unlink()
+        except FileNotFoundError:
+            pass
+
+    def test_delete_mapped_frame(self):
+        self.frame_manager.get(self.name, (4, 4))
+        delete_frame(self.frame_manager, self.name)
+        assert not self.name in self.frame_manager.shm_store
+        self.assertRaises(FileNotFoundError, shared_memory.SharedMemory, self.name)
+
+    def test_delete_unmapped_frame(self):
+        # the frame must be unlinked without opening or mapping it
+        with patch.object(
+            shared_memory, "SharedMemory", side_effect=AssertionError("mapped")
+        ):
+            delete_frame(self.frame_manager, self.name)
+        assert not self.name in self.frame_manager.shm_store
+        assert not os.path.exists(os.path.join("/dev/shm", self.name))
+
+    def test_delete_missing_frame(self):
+        delete_frame(self.frame_manager, self.name)
+        # deleting a frame that no longer exists is a no-op
+        delete_frame(self.frame_manager, self.name)
+        assert not self.name in self.frame_manager.shm_store
+
+
+if __name__ == "__main__":
+    main(verbosity=2)
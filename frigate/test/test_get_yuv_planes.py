@@ -0,0 +1,34 @@
+import cv2
+import numpy as np
+from unittest import TestCase, main
+from frigate.util import get_yuv_planes
+
+
+class TestGetYuvPlanes(TestCase):
+    def setUp(self):
+        self.frame_bgr = np.zeros((360, 640, 3), np.uint8)
+        self.frame_bgr[:] = (0, 0, 255)
+        self.yuv_frame = cv2.cvtColor(self.frame_bgr, cv2.COLOR_BGR2YUV_I420)
+
+    def test_plane_shapes(self):
+        y, u, v = get_yuv_planes(self.yuv_frame)
+        assert y.shape == (360, 640)
+        assert u.shape == (180, 320)
+        assert v.shape == (180, 320)
+
+    def test_planes_are_views(self):
+        y, u, v = get_yuv_planes(self.yuv_frame)
+        for plane in (y, u, v):
+            assert np.shares_memory(plane, self.yuv_frame)
+
+        # writing to a plane updates the matching bytes in the frame
+        y[0, 0] = 1
+        u[0, 0] = 2
+        v[-1, -1] = 3
+        assert self.yuv_frame[0, 0] == 1
+        assert self.yuv_frame[360, 0] == 2
+        assert self.yuv_frame[-1, -1] == 3
+
+
+if __name__ == "__main__":
+    main(verbosity=2)